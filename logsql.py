@@ -1,13 +1,26 @@
 #!/usr/bin/env python3
 import sys
 import os
+import io
+import mmap
 import re
 import shutil
 import platform
 import sqlite3
+import hashlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import pandas as pd
 from tabulate import tabulate
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:
+    pacsv = None
+
 # ------------------------ 工具函数 ------------------------
 
 
@@ -16,34 +29,186 @@ def clear_screen():
 
 
 def clean_string_column(col):
-    return col.map(lambda x: x.strip() if isinstance(x, str) and x is not None else x)
+    # 向量化 strip；非字符串元素会变成 NaN，用原值补回
+    try:
+        return col.str.strip().fillna(col)
+    except AttributeError:
+        return col
+
+
+@lru_cache(maxsize=None)
+def wrap_pattern(max_width):
+    return re.compile(f".{{1,{max_width}}}", re.DOTALL)
 
 
 def wrap_dataframe(df, max_width=None):
     if max_width is None:
         max_width = shutil.get_terminal_size((80, 20)).columns - 5
-    df_wrapped = df.copy()
-    for col in df.columns:
-        df_wrapped[col] = (
-            df_wrapped[col]
-            .astype(str)
-            .apply(
-                lambda x: "\n".join(
-                    [x[i : i + max_width] for i in range(0, len(x), max_width)]
-                )
-            )
-        )
+    # 逐列生成新 Series 再组装，不整表 copy；按位置取列以兼容重名列
+    pattern = wrap_pattern(max_width)
+    wrapped = {
+        i: df.iloc[:, i].astype(str).fillna("").str.findall(pattern).str.join("\n")
+        for i in range(df.shape[1])
+    }
+    df_wrapped = pd.DataFrame(wrapped, index=df.index, copy=False)
+    df_wrapped.columns = df.columns
     return df_wrapped
 
 
 # ------------------------ 文件读取 ------------------------
 
 
-def read_log(file_path, has_header=True, sep=None, chunksize=None):
+def csv_engine(sep):
+    # C 解析器支持单字符分隔符和 \s+，其余正则分隔符才需要 python 解析器
+    if sep == r"\s+" or (isinstance(sep, str) and len(sep) == 1):
+        return "c"
+    return "python"
+
+
+FLOAT_EXACT_MAX = 1e15
+
+
+def has_wide_integers(column):
+    # 15 位以上的整数值（如 24 位请求 ID）存成 float64 会丢失精度
+    if not pa.types.is_floating(column.type):
+        return False
+    wide = pc.and_(
+        pc.greater_equal(pc.abs(column), FLOAT_EXACT_MAX),
+        pc.equal(column, pc.floor(column)),
+    )
+    return bool(pc.any(wide).as_py())
+
+
+def read_csv_arrow(file_path, sep, has_header, chunksize=None, categorical=False):
+    # pyarrow 多线程解析；列数不齐等情况返回 None，交给 pandas 处理
+    def read_table(column_types=None):
+        options = dict(
+            read_options=pacsv.ReadOptions(
+                use_threads=True,
+                block_size=8 << 20,
+                autogenerate_column_names=not has_header,
+            ),
+            parse_options=pacsv.ParseOptions(delimiter=sep, quote_char='"'),
+            # categorical: 低基数字符串列按字典编码保存，重复值只存一份
+            convert_options=pacsv.ConvertOptions(
+                column_types=column_types,
+                strings_can_be_null=True,
+                auto_dict_encode=categorical,
+                auto_dict_max_cardinality=1 << 16,
+            ),
+        )
+        # 读完立即解除映射，避免文件在 Windows 上一直被占用
+        try:
+            source = pa.memory_map(file_path)
+        except OSError:
+            return pacsv.read_csv(file_path, **options)
+        with source:
+            return pacsv.read_csv(source, **options)
+
+    try:
+        table = read_table()
+        # 与 pandas 保持一致：Arrow 推断出的日期/时间列、超出 int64 被推断成
+        # 浮点的长整数列按原文本重新读取，事后 cast 会改写格式或丢精度
+        as_text = {
+            name: pa.string()
+            for name, column in zip(table.column_names, table.columns)
+            if pa.types.is_temporal(column.type) or has_wide_integers(column)
+        }
+        if as_text:
+            table = read_table(as_text)
+    except (pa.ArrowInvalid, OSError):
+        return None
+
+    names = table.column_names
+    if has_header:
+        if len(set(names)) != len(names):
+            return None
+        names = [name or f"Unnamed: {i}" for i, name in enumerate(names)]
+    else:
+        names = [f"_{i + 1}" for i in range(len(names))]
+    table = table.rename_columns(names)
+
+    def arrow_chunk_generator():
+        if chunksize is None:
+            yield table.to_pandas(self_destruct=True, split_blocks=True)
+            return
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield batch.to_pandas()
+
+    return arrow_chunk_generator()
+
+
+PARALLEL_MIN_SIZE = 32 << 20
+PARALLEL_BLOCK_SIZE = 16 << 20
+
+
+def read_csv_parallel(file_path, sep, has_header):
+    # 大文件按换行对齐切成若干字节块，多线程用 C 解析器解析（解析时释放 GIL）
+    # 含引号的文件可能有跨行字段，无法安全切分，返回 None 走顺序读取
+    try:
+        if os.path.getsize(file_path) < PARALLEL_MIN_SIZE:
+            return None
+        with open(file_path, "rb") as f:
+            if b'"' in f.read(1 << 20):
+                return None
+    except OSError:
+        return None
+
+    csv_kwargs = dict(
+        sep=sep,
+        engine="c",
+        quotechar='"',
+        on_bad_lines="skip",
+        header=None,
+        index_col=False,
+    )
+
+    def parallel_chunk_generator():
+        with open(file_path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            size = len(mm)
+            start = mm.find(b"\n") + 1 or size
+            header_bytes = io.BytesIO(mm[:start])
+            if has_header:
+                names = list(pd.read_csv(header_bytes, sep=sep, nrows=0).columns)
+            else:
+                first_row = pd.read_csv(header_bytes, nrows=1, **csv_kwargs)
+                names = [f"_{i + 1}" for i in range(len(first_row.columns))]
+                start = 0
+
+            ranges = []
+            while start < size:
+                end = mm.find(b"\n", start + PARALLEL_BLOCK_SIZE)
+                end = size if end == -1 else end + 1
+                ranges.append((start, end))
+                start = end
+
+            def parse(byte_range):
+                begin, end = byte_range
+                return pd.read_csv(io.BytesIO(mm[begin:end]), names=names, **csv_kwargs)
+
+            workers = min(8, os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # 控制在途任务数，避免整个文件同时解析进内存
+                pending = deque()
+                for byte_range in ranges:
+                    pending.append(executor.submit(parse, byte_range))
+                    if len(pending) >= workers * 2:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+
+    return parallel_chunk_generator()
+
+
+def read_log(
+    file_path, has_header=True, sep=None, chunksize=None, categorical=False, nrows=None
+):
     ext = os.path.splitext(file_path)[1].lower()
     try:
         if ext in [".xls", ".xlsx"]:
-            df = pd.read_excel(file_path, header=0 if has_header else None)
+            df = pd.read_excel(file_path, header=0 if has_header else None, nrows=nrows)
             if not has_header:
                 df.columns = [f"_{i + 1}" for i in range(len(df.columns))]
             return df, has_header
@@ -51,30 +216,91 @@ def read_log(file_path, has_header=True, sep=None, chunksize=None):
             if sep is None:
                 sep = r"\s+" if not has_header else ","
 
+            if (
+                pacsv is not None
+                and nrows is None
+                and sep != r"\s+"
+                and csv_engine(sep) == "c"
+            ):
+                chunks = read_csv_arrow(
+                    file_path, sep, has_header, chunksize, categorical
+                )
+                if chunks is not None:
+                    return chunks, has_header
+
             # 定义一个生成器，保证每个 chunk 列名一致
-            def csv_chunk_generator():
-                first_chunk = True
-                for chunk in pd.read_csv(
-                    file_path,
+            def csv_chunk_generator(skip=0):
+                colnames = None
+                done = skip  # 已产出（或需跳过）的行数
+                csv_kwargs = dict(
                     sep=sep,
-                    engine="python",
                     quotechar='"',
                     on_bad_lines="skip",
                     header=0 if has_header else None,
                     chunksize=chunksize,
-                ):
+                    nrows=nrows,
+                )
+
+                def read_chunks(engine):
+                    # C 解析器直接从 mmap 的页缓存读取；mmap 不可用时退回普通读取
+                    try:
+                        return pd.read_csv(
+                            file_path,
+                            engine=engine,
+                            memory_map=engine == "c",
+                            **csv_kwargs,
+                        )
+                    except (OSError, ValueError):
+                        return pd.read_csv(file_path, engine=engine, **csv_kwargs)
+
+                def named(chunk):
+                    nonlocal colnames
                     if not has_header:
-                        if first_chunk:
+                        if colnames is None:
                             colnames = [f"_{i + 1}" for i in range(len(chunk.columns))]
-                            first_chunk = False
                         chunk.columns = colnames
-                    yield chunk
+                    return chunk
+
+                def rows_after_done(reader):
+                    nonlocal done
+                    pos = 0
+                    for chunk in reader:
+                        pos += len(chunk)
+                        if pos > done:
+                            yield named(chunk.iloc[len(chunk) - (pos - done) :])
+                            done = pos
+
+                engine = csv_engine(sep)
+                try:
+                    yield from rows_after_done(read_chunks(engine))
+                except pd.errors.ParserError:
+                    if engine == "python":
+                        raise
+                    # C 解析器遇到未闭合的引号等会在读到一半时报错，
+                    # 改用 python 解析器从头重读，跳过已经产出的行
+                    yield from rows_after_done(read_chunks("python"))
+
+            def parallel_chunk_generator(chunks):
+                rows = 0
+                try:
+                    for chunk in chunks:
+                        rows += len(chunk)
+                        yield chunk
+                except pd.errors.ParserError:
+                    # 某个块解析失败（如开头 1 MiB 之后出现的引号），
+                    # 改用顺序读取，跳过已经产出的行
+                    yield from csv_chunk_generator(skip=rows)
+
+            if nrows is None and csv_engine(sep) == "c":
+                chunks = read_csv_parallel(file_path, sep, has_header)
+                if chunks is not None:
+                    return parallel_chunk_generator(chunks), has_header
 
             return csv_chunk_generator(), has_header
     except Exception:
         # 异常处理，保持兼容性
         if ext in [".xls", ".xlsx"]:
-            df = pd.read_excel(file_path, header=None)
+            df = pd.read_excel(file_path, header=None, nrows=nrows)
             df.columns = [f"_{i + 1}" for i in range(len(df.columns))]
             return df, False
         else:
@@ -84,9 +310,11 @@ def read_log(file_path, has_header=True, sep=None, chunksize=None):
                 for chunk in pd.read_csv(
                     file_path,
                     sep=sep if sep else r"\s+",
+                    engine="python",
                     header=None,
                     on_bad_lines="skip",
                     chunksize=chunksize,
+                    nrows=nrows,
                 ):
                     if first_chunk:
                         colnames = [f"_{i + 1}" for i in range(len(chunk.columns))]
@@ -100,52 +328,300 @@ def read_log(file_path, has_header=True, sep=None, chunksize=None):
 # ------------------------ SQLite 加载 ------------------------
 
 
-def load_dataframe_to_sqlite(conn, df_iter, table_name="current"):
-    cur = conn.cursor()
-    cur.execute(f"DROP TABLE IF EXISTS {table_name}")
+def sqlite_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+AUTOTYPE_MIN_RATIO = 0.95
+
+
+# 只接受 NUMERIC 亲和性下能原样往返的数字写法：无前导零、无 +、无指数、
+# 小数末位非 0，位数控制在 INTEGER / REAL 能精确表示的范围内
+INT_TEXT_RE = re.compile(r"-?(?:0|[1-9]\d{0,17})")
+FLOAT_TEXT_RE = re.compile(r"-?(?:0|[1-9]\d*)\.\d*[1-9]")
+FLOAT_TEXT_MAX_LEN = 16
+
+
+def numeric_text_masks(col):
+    text = col.astype(str)
+    present = col.notna()
+    is_int = present & text.str.fullmatch(INT_TEXT_RE).fillna(False)
+    is_float = (
+        present
+        & text.str.fullmatch(FLOAT_TEXT_RE).fillna(False)
+        & (text.str.len() <= FLOAT_TEXT_MAX_LEN)
+    )
+    return is_int.astype(bool), is_float.astype(bool)
+
+
+def has_inexact_numbers(values):
+    # 是否有 007、+1、1e3、1.50 这类转成数字会改变原文的写法
+    is_int, is_float = numeric_text_masks(values)
+    looks_numeric = pd.to_numeric(values.astype(str), errors="coerce").notna()
+    return bool((looks_numeric & ~(is_int | is_float)).any())
+
+
+def numeric_text_columns(chunk):
+    # 找出实际是数字、只夹杂少量占位符（如 "-"）的文本列；
+    # 出现改变原文的数字写法时整列保持文本
+    cols = set()
+    for col in chunk.select_dtypes(include=["object", "string", "category"]).columns:
+        values = chunk[col].dropna()
+        if values.empty or has_inexact_numbers(values):
+            continue
+        is_int, is_float = numeric_text_masks(values)
+        if (is_int | is_float).sum() / len(values) > AUTOTYPE_MIN_RATIO:
+            cols.add(col)
+    return cols
+
+
+def demote_to_text(conn, table_name, col_types, cols):
+    # SQLite 不能修改列亲和性，按新类型重建表；已写入的都是规范写法，
+    # 转回 TEXT 后与原文一致
+    for col in cols:
+        col_types[col] = "TEXT"
+    tmp_name = f"{table_name}__rebuild"
+    col_defs = ", ".join(f"{quote_ident(c)} {t}" for c, t in col_types.items())
+    conn.execute(f"CREATE TABLE {tmp_name} ({col_defs})")
+    conn.execute(f"INSERT INTO {tmp_name} SELECT * FROM {table_name}")
+    conn.execute(f"DROP TABLE {table_name}")
+    conn.execute(f"ALTER TABLE {tmp_name} RENAME TO {table_name}")
+
+
+def quote_ident(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
 
+def sqlite_rows(chunk):
+    # 转成 sqlite3 可直接绑定的 Python 对象，缺失值写入 NULL
+    mask = chunk.notna()
+    chunk = chunk.copy()
+    for col in chunk.select_dtypes(include=["datetime", "datetimetz", "timedelta"]):
+        chunk[col] = chunk[col].astype(str)
+    # 超出 int64 的整数（如 24 位请求 ID）SQLite 无法绑定，按原文保存为文本
+    for col in chunk.columns[chunk.dtypes == object]:
+        values = chunk[col]
+        too_wide = values.map(
+            lambda v: isinstance(v, int) and not INT64_MIN <= v <= INT64_MAX
+        )
+        if too_wide.any():
+            chunk[col] = values.where(~too_wide, values.astype(str))
+    chunk = chunk.astype(object).where(mask, None)
+    return chunk.itertuples(index=False, name=None)
+
+
+def normalize_columns(chunk):
+    if chunk.columns.str.contains("Unnamed").any():
+        chunk.columns = [f"_{i + 1}" for i in range(len(chunk.columns))]
+
+
+def load_dataframe_to_sqlite(conn, df_iter, table_name="current", autotype=True):
     if isinstance(df_iter, pd.DataFrame):
-        df_iter.to_sql(table_name, conn, if_exists="append", index=False)
+        chunks = [df_iter]
     elif hasattr(df_iter, "__iter__"):
-        for chunk in df_iter:
-            if chunk.columns.str.contains("Unnamed").any():
-                chunk.columns = [f"_{i + 1}" for i in range(len(chunk.columns))]
-            chunk.to_sql(table_name, conn, if_exists="append", index=False)
+        chunks = df_iter
     else:
         raise TypeError(f"Unsupported object type: {type(df_iter)}")
 
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+    # 批量导入时关闭持久化保证，数据本身可随时从源文件重建
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA journal_mode=MEMORY")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+
+    insert_sql = None
+    conn.execute("BEGIN")
+    try:
+        for chunk in chunks:
+            if chunks is df_iter:
+                normalize_columns(chunk)
+            if insert_sql is None:
+                # 数字文本列声明为 NUMERIC：数字按 INTEGER/REAL 存储（按值变长），
+                # 占位符保留为 TEXT，WHERE status = '403' 这类带引号的比较照常匹配
+                numeric_cols = numeric_text_columns(chunk) if autotype else set()
+                col_types = {
+                    c: "NUMERIC" if c in numeric_cols else sqlite_type(t)
+                    for c, t in chunk.dtypes.items()
+                }
+                col_defs = ", ".join(
+                    f"{quote_ident(c)} {t}" for c, t in col_types.items()
+                )
+                conn.execute(f"CREATE TABLE {table_name} ({col_defs})")
+                placeholders = ", ".join("?" * len(chunk.columns))
+                insert_sql = f"INSERT INTO {table_name} VALUES ({placeholders})"
+            elif numeric_cols:
+                # 后续块出现会被 NUMERIC 改写的写法（如 007）时，该列改回 TEXT
+                inexact = {
+                    c for c in numeric_cols if has_inexact_numbers(chunk[c].dropna())
+                }
+                if inexact:
+                    demote_to_text(conn, table_name, col_types, inexact)
+                    numeric_cols -= inexact
+            conn.executemany(insert_sql, sqlite_rows(chunk))
+        if insert_sql is not None:
+            conn.execute(f"ANALYZE {table_name}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
 
 # ------------------------ SQL 执行 ------------------------
 
 
-def execute_sql(conn, query):
+DOLLAR_COL_RE = re.compile(r"\$(\d+)")
+IDENT = r'"[^"]+"|`[^`]+`|\[[^\]]+\]|[\w$]+'
+STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+# 只认 SQLite 能走索引的谓词：=、IN、范围比较、BETWEEN（不含 !=、<>、LIKE）
+WHERE_COL_RE = re.compile(
+    rf"\b(?:where|and|or)\s+({IDENT})\s*(?:==?|<(?!>)=?|>=?|in\b|between\b)",
+    re.IGNORECASE,
+)
+ORDER_GROUP_RE = re.compile(
+    r"\b(order|group)\s+by\s+(.+?)(?=\b(?:limit|having|order)\b|;|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+ORDER_GROUP_COL_RE = re.compile(rf"\s*({IDENT})\s*(?:asc|desc)?\s*$", re.IGNORECASE)
+AGGREGATE_RE = re.compile(
+    r"\b(?:count|sum|avg|min|max|total|group_concat)\s*\(|\bgroup\s+by\b",
+    re.IGNORECASE,
+)
+
+
+def filter_columns(query):
+    # 先去掉字符串字面量，避免 'a and b = 1' 里的内容被当成列名
+    query = STRING_LITERAL_RE.sub("''", query)
+    cols = [m.group(1) for m in WHERE_COL_RE.finditer(query)]
+    # 聚合查询的 ORDER BY 作用在分组结果上，原表索引用不上
+    aggregate = AGGREGATE_RE.search(query) is not None
+    for m in ORDER_GROUP_RE.finditer(query):
+        if m.group(1).lower() == "order" and aggregate:
+            continue
+        for item in m.group(2).split(","):
+            col = ORDER_GROUP_COL_RE.fullmatch(item)
+            if col:
+                cols.append(col.group(1))
+    return [c[1:-1] if c[0] in '"`[' else c for c in cols]
+
+
+def ensure_indexes(conn, query, indexed, table_name="current"):
+    # 对 WHERE / ORDER BY / GROUP BY 中出现过的列按需建索引，后续同类查询走索引
+    table_cols = None
+    for col in filter_columns(query):
+        if col in indexed:
+            continue
+        if table_cols is None:
+            table_cols = {
+                row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")
+            }
+        if col not in table_cols:
+            continue
+        index_name = quote_ident(f"idx_{table_name}_{col}")
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {index_name} "
+            f"ON {table_name}({quote_ident(col)})"
+        )
+        conn.execute(f"ANALYZE {index_name}")
+        indexed.add(col)
+
+
+def prepare_query(conn, query, indexed=None):
     query = query.strip().rstrip(";")
-    query = re.sub(r"\$(\d+)", r"_\1", query)
+    query = DOLLAR_COL_RE.sub(r"_\1", query)
+    if indexed is not None:
+        ensure_indexes(conn, query, indexed)
+    return query
+
+
+def clean_result(df):
+    for col in df.select_dtypes(include=["object", "string"]).columns:
+        df[col] = clean_string_column(df[col])
+    return df
+
+
+def execute_sql(conn, query, indexed=None):
     try:
-        df = pd.read_sql_query(query, conn)
-        for col in df.select_dtypes(include="object"):
-            df[col] = clean_string_column(df[col])
-        return wrap_dataframe(df)
+        query = prepare_query(conn, query, indexed)
+        return clean_result(pd.read_sql_query(query, conn))
     except Exception as e:
         print(f"SQL 执行出错，请检查语法或列名: {e}")
         return None
 
 
+def count_rows(conn, query, cur, fetched):
+    # 在 SQLite 内计数，不把剩余行取回 Python；换行收尾，避免查询末尾的
+    # -- 注释吞掉右括号。子查询不成立时退回逐批计数
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM ({query}\n)").fetchone()[0]
+    except sqlite3.Error:
+        total = fetched
+        while True:
+            batch = cur.fetchmany(10_000)
+            if not batch:
+                return total
+            total += len(batch)
+
+
+def fetch_preview(conn, query, indexed=None, max_rows=1000):
+    # 仅用于显示：游标只取前 max_rows 行建 DataFrame，超出时在 SQLite 内计数
+    # 返回 (df, 总行数)
+    try:
+        query = prepare_query(conn, query, indexed)
+        cur = conn.execute(query)
+        if cur.description is None:
+            return None, 0
+        cols = [d[0] for d in cur.description]
+        rows = cur.fetchmany(max_rows + 1)
+        total = len(rows)
+        if total > max_rows:
+            rows = rows[:max_rows]
+            total = count_rows(conn, query, cur, total)
+        return clean_result(pd.DataFrame.from_records(rows, columns=cols)), total
+    except Exception as e:
+        print(f"SQL 执行出错，请检查语法或列名: {e}")
+        return None, 0
+
+
 # ------------------------ 输出 ------------------------
 
 
-def print_result(df, is_header=True):
+DISPLAY_MAX_ROWS = 1000
+
+
+def print_result(df, is_header=True, total=None):
     if df is None or df.empty:
         print("(0 rows)")
         return
-    df_display = df.copy()
+    if total is None:
+        total = len(df)
+    df_display = df.head(DISPLAY_MAX_ROWS)
     if not is_header:
         df_display.columns = [
             f"${int(c[1:])}" if c.startswith("_") and c[1:].isdigit() else c
             for c in df_display.columns
         ]
-    print(tabulate(df_display, headers="keys", tablefmt="grid", showindex=False))
-    print(f"({len(df_display)} row{'s' if len(df_display) != 1 else ''})")
+    max_width = shutil.get_terminal_size((80, 20)).columns - 5
+    if total > DISPLAY_MAX_ROWS:
+        # 大结果集不走 tabulate（逐单元格纯 Python 开销大），只显示前若干行
+        print(df_display.to_string(index=False, max_colwidth=max_width))
+        print(f"... ({total - DISPLAY_MAX_ROWS} rows not shown)")
+    else:
+        df_display = wrap_dataframe(df_display, max_width)
+        print(tabulate(df_display, headers="keys", tablefmt="grid", showindex=False))
+    print(f"({total} row{'s' if total != 1 else ''})")
 
 
 # ------------------------ 导出功能 ------------------------
@@ -169,6 +645,215 @@ def export_dataframe(df, filename):
         print(f"Export failed: {e}")
 
 
+# ------------------------ 磁盘缓存 ------------------------
+
+
+def table_cache_path(state):
+    # 文件名为 <路径哈希>-<内容键>：内容键由 (mtime, 大小, 分隔符, 表头模式) 生成，
+    # 源文件变化后自动失效；路径哈希用于清理同一文件的旧缓存
+    if not state.get("use_cache", True):
+        return None
+    try:
+        st = os.stat(state["file_path"])
+    except OSError:
+        return None
+    abs_path = os.path.abspath(state["file_path"])
+    raw_key = (
+        f"{abs_path}|{st.st_mtime_ns}|{st.st_size}|{state['sep']}|{state['is_header']}"
+        f"|{state['autotype']}"
+    )
+    path_key = hashlib.blake2b(abs_path.encode("utf-8")).hexdigest()[:16]
+    key = hashlib.blake2b(raw_key.encode("utf-8")).hexdigest()[:16]
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "logsql", f"{path_key}-{key}.sqlite")
+
+
+def restore_table_cache(conn, cache_path):
+    # 命中时把缓存库整体拷进内存库，返回 is_header；未命中返回 None
+    if cache_path is None or not os.path.exists(cache_path):
+        return None
+    try:
+        disk = sqlite3.connect(f"file:{cache_path}?mode=ro", uri=True)
+        try:
+            version = disk.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (1, 2):
+                return None
+            if conn.in_transaction:
+                conn.commit()
+            disk.backup(conn)
+        finally:
+            disk.close()
+    except sqlite3.Error:
+        return None
+    return version == 1
+
+
+def save_table_cache(conn, cache_path, is_header):
+    # 缓存写失败（只读目录等）不影响正常使用
+    if cache_path is None:
+        return
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        # 缓存是日志内容的完整副本，目录和文件只允许当前用户访问
+        cache_dir = os.path.dirname(cache_path)
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        os.chmod(cache_dir, 0o700)
+        os.close(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600))
+        disk = sqlite3.connect(tmp_path)
+        try:
+            conn.backup(disk)
+            disk.execute(f"PRAGMA user_version = {1 if is_header else 2}")
+            disk.commit()
+        finally:
+            disk.close()
+        os.replace(tmp_path, cache_path)
+    except (OSError, sqlite3.Error):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return
+    remove_stale_caches(cache_path)
+
+
+def remove_stale_caches(cache_path):
+    # 同一源文件只保留最新一份缓存（文件增长、换分隔符都会产生新键）
+    cache_dir, name = os.path.split(cache_path)
+    prefix = name.split("-", 1)[0] + "-"
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    for other in names:
+        if other != name and other.startswith(prefix) and other.endswith(".sqlite"):
+            try:
+                os.remove(os.path.join(cache_dir, other))
+            except OSError:
+                pass
+
+
+# ------------------------ 延迟加载 ------------------------
+
+
+def open_log(state, nrows=None):
+    read_kwargs = dict(
+        chunksize=state["chunksize"],
+        categorical=state.get("categorical", False),
+        nrows=nrows,
+    )
+    sep = state["sep"]
+    no_header_sep = sep if sep else r"\s+"
+    if not state["is_header"]:
+        return read_log(
+            state["file_path"], has_header=False, sep=no_header_sep, **read_kwargs
+        )
+    df_iter, is_header = read_log(
+        state["file_path"], has_header=True, sep=sep, **read_kwargs
+    )
+    if not is_header:
+        df_iter, is_header = read_log(
+            state["file_path"], has_header=False, sep=no_header_sep, **read_kwargs
+        )
+    return df_iter, is_header
+
+
+def read_head(state, n):
+    # 表尚未导入时，.head / .cols 只解析文件开头 n 行
+    df_iter, state["is_header"] = open_log(state, nrows=n)
+    if isinstance(df_iter, pd.DataFrame):
+        df = df_iter
+    else:
+        chunks = list(df_iter)
+        if not chunks:
+            return pd.DataFrame()
+        df = pd.concat(chunks, ignore_index=True)
+    normalize_columns(df)
+    if df.columns.empty:
+        return df
+    # 经同一套导入流程写入临时内存表再读回，预览与导入后的类型保持一致
+    # （布尔存为 0/1、数字文本按 autotype 规则处理）；autotype 只依据这 n 行判断
+    tmp = sqlite3.connect(":memory:")
+    try:
+        load_dataframe_to_sqlite(tmp, df, autotype=state["autotype"])
+        return pd.read_sql_query("SELECT * FROM current", tmp)
+    finally:
+        tmp.close()
+
+
+def invalidate_table(state):
+    state["loaded"] = False
+    state["table_version"] += 1
+    state["preview_cache"].clear()
+    state["indexed_cols"].clear()
+    state["cols"] = None
+    state["first_row"] = None
+    state["cols_rendered"] = None
+
+
+def ensure_loaded(state):
+    # 第一次执行需要全表的操作时才完整导入 SQLite；导入失败返回 False，
+    # 下次需要时重试
+    if state["loaded"]:
+        return True
+    conn = state["conn"]
+    cache_path = table_cache_path(state)
+    try:
+        is_header = restore_table_cache(conn, cache_path)
+        if is_header is None:
+            df_iter, is_header = open_log(state)
+            load_dataframe_to_sqlite(conn, df_iter, autotype=state["autotype"])
+            save_table_cache(conn, cache_path, is_header)
+    except Exception as e:
+        print(f"文件加载失败: {e}")
+        return False
+    invalidate_table(state)
+    state["is_header"] = is_header
+    state["loaded"] = True
+    # 列信息和首行预览在重新加载前不会变化，导入时算好供 .cols 直接使用
+    state["cols"] = [row[1] for row in conn.execute("PRAGMA table_info(current)")]
+    state["first_row"] = (
+        pd.read_sql_query("SELECT * FROM current LIMIT 1", conn)
+        if state["cols"]
+        else pd.DataFrame()
+    )
+    return True
+
+
+# ------------------------ 预览缓存 ------------------------
+
+PREVIEW_CACHE_SIZE = 16
+
+
+def load_preview(state, kind, n):
+    # .head/.tail 结果按 (表版本, 修改计数, 类型, N) 缓存，表未变化时直接复用
+    conn = state["conn"]
+    cache = state["preview_cache"]
+    key = (state["table_version"], conn.total_changes, kind, n)
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+
+    if kind == "head" and not state["loaded"]:
+        try:
+            df = read_head(state, n)
+        except Exception as e:
+            print(f"文件读取失败: {e}")
+            return None
+    elif kind == "head":
+        df = pd.read_sql_query(f"SELECT * FROM current LIMIT {n}", conn)
+    else:
+        if not ensure_loaded(state):
+            return None
+        total = pd.read_sql_query("SELECT COUNT(*) AS c FROM current", conn)["c"][0]
+        offset = max(total - n, 0)
+        df = pd.read_sql_query(f"SELECT * FROM current LIMIT {n} OFFSET {offset}", conn)
+
+    cache[key] = df
+    if len(cache) > PREVIEW_CACHE_SIZE:
+        cache.popitem(last=False)
+    return df
+
+
 # ------------------------ CLI ------------------------
 
 
@@ -190,6 +875,31 @@ def print_help():
     print("  .q              Quit")
 
 
+def render_cols(state):
+    # .cols 的完整输出在表重新加载前不变，渲染一次后缓存在 state 中
+    if state["loaded"]:
+        cols = state["cols"]
+        first_row = state["first_row"]
+    else:
+        first_row = load_preview(state, "head", 1)
+        if first_row is None:
+            return None
+        cols = list(first_row.columns)
+    cols_display = (
+        cols if state["is_header"] else [f"${i + 1}" for i in range(len(cols))]
+    )
+    text = "Columns:\n" + ", ".join(cols_display)
+
+    # 仅非 Excel/CSV 文件打印第一行预览
+    if not state.get("is_excel", False) and not state["df_empty"]:
+        df = first_row.copy()
+        if not state["is_header"]:
+            df.columns = cols_display
+        text += "\n\nFirst row preview:\n"
+        text += tabulate(df, headers="keys", tablefmt="grid", showindex=False)
+    return text
+
+
 def handle_command(line, state):
     cmd = line[1:].strip()
     cmd_lower = cmd.lower()
@@ -202,40 +912,28 @@ def handle_command(line, state):
     elif cmd_lower == "help":
         print_help()
     elif cmd_lower.startswith("cols"):
-        cur = conn.cursor()
-        cur.execute("PRAGMA table_info(current);")
-        cols_info = cur.fetchall()
-        cols = [row[1] for row in cols_info]
-        cols_display = (
-            cols if state["is_header"] else [f"${i + 1}" for i in range(len(cols))]
-        )
-        print("Columns:\n" + ", ".join(cols_display))
-
-        # 仅非 Excel/CSV 文件打印第一行预览
-        if not state.get("is_excel", False) and not state["df_empty"]:
-            df = pd.read_sql_query("SELECT * FROM current LIMIT 1", conn)
-            if not state["is_header"]:
-                df.columns = cols_display
-            print("\nFirst row preview:")
-            print(tabulate(df, headers="keys", tablefmt="grid", showindex=False))
+        if state["cols_rendered"] is None:
+            state["cols_rendered"] = render_cols(state)
+        if state["cols_rendered"] is not None:
+            print(state["cols_rendered"])
     elif cmd_lower.startswith("head"):
         n = 5
         parts = cmd.split()
         if len(parts) >= 2 and parts[1].isdigit():
             n = int(parts[1])
-        df = pd.read_sql_query(f"SELECT * FROM current LIMIT {n}", conn)
+        df = load_preview(state, "head", n)
         print_result(df, is_header=state["is_header"])
         state["last_df"] = df
+        state["last_query"] = None
     elif cmd_lower.startswith("tail"):
         n = 5
         parts = cmd.split()
         if len(parts) >= 2 and parts[1].isdigit():
             n = int(parts[1])
-        total = pd.read_sql_query("SELECT COUNT(*) AS c FROM current", conn)["c"][0]
-        offset = max(total - n, 0)
-        df = pd.read_sql_query(f"SELECT * FROM current LIMIT {n} OFFSET {offset}", conn)
+        df = load_preview(state, "tail", n)
         print_result(df, is_header=state["is_header"])
         state["last_df"] = df
+        state["last_query"] = None
     elif cmd_lower.startswith("sep"):
         parts = cmd.split(maxsplit=1)
         if len(parts) == 2:
@@ -243,31 +941,46 @@ def handle_command(line, state):
             state["sep"] = new_sep
             # 仅对非 Excel 文件重新加载数据
             if not state.get("is_excel", False):
-                print(f"Changing separator to: {repr(new_sep)} and reloading table...")
-                conn = state["conn"]
-                conn.execute("DROP TABLE IF EXISTS current")
-                df_iter, is_header = read_log(
-                    state["file_path"],
-                    has_header=state["is_header"],
-                    sep=new_sep,
-                    chunksize=state.get("chunksize", None),
-                )
-                load_dataframe_to_sqlite(conn, df_iter)
-                print("Table reloaded.")
+                was_loaded = state["loaded"]
+                invalidate_table(state)
+                if was_loaded:
+                    print(
+                        f"Changing separator to: {repr(new_sep)} and reloading table..."
+                    )
+                    if ensure_loaded(state):
+                        print("Table reloaded.")
+                else:
+                    print(f"Changing separator to: {repr(new_sep)}")
         else:
             print(f"Current separator: {repr(state['sep'])}")
     elif cmd_lower.startswith("export"):
         parts = cmd.split(maxsplit=1)
         if len(parts) == 2:
+            if last_df is None and state.get("last_query"):
+                # 显示时只取了前若干行，导出时重新执行完整查询
+                last_df = execute_sql(conn, state["last_query"], state["indexed_cols"])
             export_dataframe(last_df, parts[1])
         else:
             print("Usage: .export <filename>")
     elif cmd_lower == "clear":
         clear_screen()
     else:
-        df = execute_sql(conn, line)
-        print_result(df, is_header=state["is_header"])
+        run_query(state, line)
+
+
+def run_query(state, query):
+    if not ensure_loaded(state):
+        return
+    df, total = fetch_preview(
+        state["conn"], query, state["indexed_cols"], max_rows=DISPLAY_MAX_ROWS
+    )
+    print_result(df, is_header=state["is_header"], total=total)
+    if df is not None and total > len(df):
+        state["last_df"] = None
+        state["last_query"] = query
+    else:
         state["last_df"] = df
+        state["last_query"] = None
 
 
 def sql_cli(state):
@@ -293,9 +1006,7 @@ def sql_cli(state):
         if ";" in buffer:
             query = buffer
             buffer = ""
-            df = execute_sql(state["conn"], query)
-            print_result(df, is_header=state["is_header"])
-            state["last_df"] = df
+            run_query(state, query)
 
 
 # ------------------------ 主程序 ------------------------
@@ -303,7 +1014,9 @@ def sql_cli(state):
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python logsql.py <file> [--sep ,|\\t| ]")
+        print(
+            "Usage: python logsql.py <file> [--sep ,|\\t| ] [--categorical] [--no-autotype] [--no-cache]"
+        )
         return
     file_path = sys.argv[1]
     if not os.path.exists(file_path):
@@ -314,39 +1027,46 @@ def main():
         idx = sys.argv.index("--sep")
         if idx + 1 < len(sys.argv):
             sep = sys.argv[idx + 1].encode("utf-8").decode("unicode_escape")
+    categorical = "--categorical" in sys.argv
+    autotype = "--no-autotype" not in sys.argv
+    use_cache = "--no-cache" not in sys.argv
 
     ext = os.path.splitext(file_path)[1].lower()
     force_no_header = ext not in [".csv", ".xls", ".xlsx"]
+    # 字典编码只在 pyarrow 读取时有意义：pandas 读取按块直接写入 SQLite，
+    # 转成 category 不会降低内存
+    arrow_sep = sep if sep else (r"\s+" if force_no_header else ",")
+    if categorical and (
+        pacsv is None
+        or ext in [".xls", ".xlsx"]
+        or arrow_sep == r"\s+"
+        or csv_engine(arrow_sep) != "c"
+    ):
+        print("--categorical 仅在用 pyarrow 读取 CSV 时生效，本次将忽略")
 
-    chunksize = 100_000
-    if force_no_header:
-        df_iter, is_header = read_log(
-            file_path, has_header=False, sep=sep if sep else r"\s+", chunksize=chunksize
-        )
-    else:
-        df_iter, is_header = read_log(
-            file_path, has_header=True, sep=sep, chunksize=chunksize
-        )
-        if not is_header:
-            df_iter, is_header = read_log(
-                file_path,
-                has_header=False,
-                sep=sep if sep else r"\s+",
-                chunksize=chunksize,
-            )
-
+    # 启动时不解析文件，第一次需要全表的查询才导入 SQLite
     conn = sqlite3.connect(":memory:")
-    load_dataframe_to_sqlite(conn, df_iter)
 
     state = {
         "conn": conn,
-        "is_header": is_header,
+        "is_header": not force_no_header,
         "sep": sep,
         "df_empty": False,
         "last_df": None,
+        "last_query": None,
         "file_path": file_path,
         "is_excel": ext in [".xls", ".xlsx"],
-        "chunksize": chunksize,
+        "chunksize": 100_000,
+        "categorical": categorical,
+        "autotype": autotype,
+        "use_cache": use_cache,
+        "table_version": 0,
+        "preview_cache": OrderedDict(),
+        "indexed_cols": set(),
+        "loaded": False,
+        "cols": None,
+        "first_row": None,
+        "cols_rendered": None,
     }
 
     sql_cli(state)